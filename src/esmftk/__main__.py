@@ -15,6 +15,8 @@ import sys
 # local
 from .__init__ import __version__
 from .packageout import PackageOut
+from .service import TestClient, TestService
+from .testresult import TestResults
 from .testsuite import TestSuite
 
 def RunTestSuite(argv):
@@ -30,16 +32,85 @@ def RunTestSuite(argv):
     parser.add_argument('--color', action='store_true',
         help='add color to output',
     )
+    parser.add_argument('--shard', metavar='i/N',
+        help='run only shard i of N (1-based) of the expanded test list'
+    )
+    parser.add_argument('--costs', metavar='RESULTS',
+        help='results file with test durations used to balance shards, ' +
+             'use the same file for every shard'
+    )
+    parser.add_argument('--rerun-failed', action='store_true',
+        help='run only tests that failed or were missing in the last results'
+    )
+    parser.add_argument('--changed', action='store_true',
+        help='run only tests whose options, inputs or executable changed ' +
+             'since their last successful run'
+    )
+    parser.add_argument('--filter', metavar='REGEX',
+        help='run only tests with names matching REGEX'
+    )
+    parser.add_argument('--gather', metavar='RESULTS', nargs='+',
+        help='combine shard results files into one report and exit'
+    )
+    parser.add_argument('--format', choices=['markdown', 'csv'],
+        default='markdown',
+        help='report format for --gather (default: markdown)'
+    )
+    parser.add_argument('--output', metavar='FILE',
+        help='write combined results file for --gather'
+    )
+    parser.add_argument('--serve', action='store_true',
+        help='start a long-lived service that runs submitted testsuites'
+    )
+    parser.add_argument('--stop', action='store_true',
+        help='stop a running service and exit'
+    )
+    parser.add_argument('--socket', metavar='PATH',
+        help='service socket (default: per user and working directory)'
+    )
+    parser.add_argument('--cores', type=int,
+        help='core budget shared by service jobs (default: all cores)'
+    )
+    parser.add_argument('--local', action='store_true',
+        help='run testsuite in this process even if a service is running'
+    )
     args = parser.parse_args()
 
     if args.version:
         print("ESMF TestKit v" + __version__)
+    elif args.gather is not None:
+        p = PackageOut(args.color)
+        r = TestResults.gather(args.gather, args.output, p)
+        if args.format == "csv":
+            print(r.csv())
+        else:
+            print(r.markdown())
+        if r.failed():
+            return 101
+        elif not r.complete:
+            return 1
+        return 0
+    elif args.serve:
+        p = PackageOut(args.color)
+        s = TestService(args.socket, args.cores, p)
+        return s.run()
+    elif args.stop:
+        p = PackageOut(args.color)
+        c = TestClient(args.socket, p)
+        if not c.available():
+            p.abort('service not running')
+        return c.stop()
     elif args.testsuite is None:
         parser.error('requires [testsuite]')
     else:
         p = PackageOut(args.color)
-        t = TestSuite(args.testsuite, p)
-        rc = t.run()
+        c = TestClient(args.socket, p)
+        if not args.local and c.available():
+            rc = c.submit(args.testsuite, args.shard, args.costs,
+                args.rerun_failed, args.changed, args.filter)
+            return rc
+        t = TestSuite(args.testsuite, p, args.shard, args.costs)
+        rc = t.run(args.rerun_failed, args.changed, args.filter)
         return rc
 
 if sys.version_info < (3, 9):
@@ -17,6 +17,8 @@ from .packageout import *
 
 class ESMFInstallation():
 
+    cache = {}
+
     def __init__(self, esmfpath: str, pkgout: PackageOut=None):
         if PackageOut is None:
             self.pkgout = PackageOut()
@@ -35,6 +37,7 @@ class ESMFInstallation():
             if self.mkfile is None:
                 self.pkgout.abort('esmf.mk file not found - ' + esmfpath)
         self.config = {}
+        self.mktime = os.path.getmtime(self.mkfile)
         with open(self.mkfile, "r") as file:
             hasher = hashlib.shake_256()
             for line in file:
@@ -49,8 +52,20 @@ class ESMFInstallation():
         if 'F' in self.config["ESMF_VERSION_PUBLIC"]:
             self.vers += '-dev'
 
-    def setenv(self):
-        os.environ["ESMFMKFILE"] = self.mkfile
+    @classmethod
+    def cached(cls, esmfpath: str, pkgout: PackageOut=None):
+        # reuse parsed installations while esmf.mk is unchanged
+        key = os.path.abspath(esmfpath)
+        esmf = cls.cache.get(key)
+        if esmf is not None and os.path.exists(esmf.mkfile):
+            if os.path.getmtime(esmf.mkfile) == esmf.mktime:
+                return esmf
+        esmf = cls(esmfpath, pkgout)
+        cls.cache[key] = esmf
+        return esmf
+
+    def env(self):
+        return {"ESMFMKFILE": self.mkfile}
 
     def __str__(self):
         msg = ("ESMF Build Information" +
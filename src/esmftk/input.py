@@ -12,13 +12,34 @@ Flight Center. All rights reserved.
 #standard
 from datetime import datetime as dt
 from getpass import getuser
+from functools import lru_cache
 from importlib.resources import files
+import hashlib
 import os
 import re
 import shutil
 # local
 from .packageout import *
 
+@lru_cache(maxsize=None)
+def package_file(fpath: str):
+    # resolve and cache paths relative to the package resources
+    return os.path.join(files(__package__), fpath)
+
+_digests = {}
+
+def file_digest(fpath: str):
+    # content digest cached while file path, size and mtime are unchanged
+    stat = os.stat(fpath)
+    key = (os.path.abspath(fpath), stat.st_size, stat.st_mtime_ns)
+    if key not in _digests:
+        hasher = hashlib.shake_256()
+        with open(fpath, 'rb') as ifile:
+            for chunk in iter(lambda: ifile.read(1 << 20), b''):
+                hasher.update(chunk)
+        _digests[key] = hasher.hexdigest(16)
+    return _digests[key]
+
 class Input():
 
     def __init__(self, settings: dict, pkgout: PackageOut=None):
@@ -38,8 +59,8 @@ class Input():
             self.infile = str(settings['infile'])
         if os.path.exists(self.infile):
             pass
-        elif os.path.exists(os.path.join(files(__package__), self.infile)):
-            self.infile = os.path.join(files(__package__), self.infile)
+        elif os.path.exists(package_file(self.infile)):
+            self.infile = package_file(self.infile)
         else:
             self.pkgout.abort("input - infile not found " + self.infile)
         if 'outfile' not in settings:
@@ -147,6 +168,25 @@ class Input():
             if eof > index:
                 ofile.write(template[index:eof])
 
+    def fingerprint(self):
+        # digest of input settings and infile contents
+        hasher = hashlib.shake_256()
+        settings = [self.itype, self.outfile,
+            sorted((str(k), str(v)) for k, v in self.vardict.items())]
+        hasher.update(bytes(repr(settings), 'utf-8'))
+        if os.path.isfile(self.infile):
+            fpaths = [self.infile]
+        else:
+            fpaths = []
+            for root, dirs, fnames in os.walk(self.infile):
+                dirs.sort()
+                for fname in sorted(fnames):
+                    fpaths.append(os.path.join(root, fname))
+        for fpath in fpaths:
+            hasher.update(bytes(os.path.relpath(fpath, self.infile), 'utf-8'))
+            hasher.update(bytes(file_digest(fpath), 'utf-8'))
+        return hasher.hexdigest(8)
+
     def __str__(self):
         msg = ("Input Information" +
             "\n  type: " + self.itype +
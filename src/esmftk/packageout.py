@@ -16,11 +16,12 @@ class PackageOut():
 
     colorful=False
 
-    def __init__(self, colorful: bool=None):
+    def __init__(self, colorful: bool=None, stream=None):
         if colorful is None:
             self.colorful = False
         else:
             self.colorful = colorful
+        self.stream = stream
 
     def abort(self, message: str):
         if self.colorful:
@@ -48,15 +49,19 @@ class PackageOut():
 
     def error(self, message: str):
         if self.colorful:
-            print('\033[91mERROR: ' + message + '\033[0m')
+            print('\033[91mERROR: ' + message + '\033[0m', file=self.stream)
         else:
-            print('ERROR: ' + message)
+            print('ERROR: ' + message, file=self.stream)
 
     def warning(self, message: str):
         if self.colorful:
-            print('\033[93mWARNING: ' + message + '\033[0m')
+            print('\033[93mWARNING: ' + message + '\033[0m',
+                file=self.stream)
         else:
-            print('WARNING: ' + message)
+            print('WARNING: ' + message, file=self.stream)
+
+    def message(self, message: str):
+        print(message, file=self.stream)
 
     def __str__(self):
         return "PackageOut.colorful=" + str(self.colorful)
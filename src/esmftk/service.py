@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+'''
+ESMF TestKit (esmftk)
+
+Copyright (c) 2002-2025 University Corporation for Atmospheric Research,
+Massachusetts Institute of Technology, Geophysical Fluid Dynamics Laboratory,
+University of Michigan, National Centers for Environmental Prediction, Los
+Alamos National Laboratory, Argonne National Laboratory, NASA Goddard Space
+Flight Center. All rights reserved.
+'''
+
+# standard
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+import tempfile
+# local
+from .packageout import *
+from .testsuite import *
+
+def socket_dir():
+    # per-user directory so other users cannot place the socket
+    rundir = os.environ.get("XDG_RUNTIME_DIR")
+    if rundir is not None and os.path.isdir(rundir):
+        return os.path.join(rundir, "esmftk")
+    return os.path.join(tempfile.gettempdir(), "esmftk-" + str(os.getuid()))
+
+def default_socket(workdir: str=None):
+    # socket path unique to the user and working directory
+    if workdir is None:
+        workdir = os.getcwd()
+    hasher = hashlib.shake_256()
+    hasher.update(bytes(os.path.abspath(workdir), 'utf-8'))
+    return os.path.join(socket_dir(), hasher.hexdigest(8) + ".sock")
+
+def private_dir(dirpath: str):
+    # directory owned by the user and closed to everyone else
+    try:
+        st = os.lstat(dirpath)
+    except OSError:
+        return False
+    return (stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and
+        stat.S_IMODE(st.st_mode) & 0o077 == 0)
+
+class JobStream():
+
+    def __init__(self, writer: asyncio.StreamWriter,
+            loop: asyncio.AbstractEventLoop):
+        self.writer = writer
+        self.loop = loop
+
+    def write(self, text: str):
+        # safe to call from worker threads
+        if len(text) > 0:
+            self.loop.call_soon_threadsafe(self.send, {"out": text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def send(self, message: dict):
+        if not self.writer.is_closing():
+            self.writer.write(bytes(json.dumps(message) + "\n", 'utf-8'))
+
+class CoreBudget():
+
+    def __init__(self, cores: int):
+        self.cores = cores
+        self.free = cores
+        self.cond = asyncio.Condition()
+
+    async def acquire(self, ncores: int):
+        ncores = min(max(ncores, 1), self.cores)
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.free >= ncores)
+            self.free -= ncores
+        return ncores
+
+    async def release(self, ncores: int):
+        async with self.cond:
+            self.free += ncores
+            self.cond.notify_all()
+
+class TestService():
+
+    def __init__(self, sockpath: str=None, cores: int=None,
+            pkgout: PackageOut=None):
+        if pkgout is None:
+            self.pkgout = PackageOut()
+        else:
+            self.pkgout = pkgout
+        self.workdir = os.getcwd()
+        if sockpath is None:
+            self.sockpath = default_socket(self.workdir)
+            sockdir = os.path.dirname(self.sockpath)
+            try:
+                os.makedirs(sockdir, mode=0o700, exist_ok=True)
+            except OSError:
+                pass
+            if not private_dir(sockdir):
+                self.pkgout.abort('socket directory must be owned by the ' +
+                    'user with mode 0700 - ' + sockdir)
+        else:
+            self.sockpath = os.path.abspath(sockpath)
+        if cores is None:
+            self.cores = os.cpu_count() or 1
+        else:
+            self.cores = int(cores)
+        if self.cores < 1:
+            self.pkgout.abort('cores must be >= 1 - ' + str(cores))
+        self.warm = {}
+        self.locks = {}
+        self.jobs = set()
+        self.stopping = False
+
+    def run(self):
+        if TestClient(self.sockpath).available():
+            self.pkgout.abort('service already running - ' + self.sockpath)
+        if os.path.lexists(self.sockpath):
+            try:
+                os.remove(self.sockpath)
+            except OSError as exc:
+                self.pkgout.abort('cannot remove stale socket - ' +
+                    self.sockpath + ' (' + exc.strerror + ')')
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if os.path.exists(self.sockpath):
+                os.remove(self.sockpath)
+        return 0
+
+    async def serve(self):
+        self.budget = CoreBudget(self.cores)
+        self.stopped = asyncio.Event()
+        server = await asyncio.start_unix_server(self.handle,
+            path=self.sockpath)
+        os.chmod(self.sockpath, 0o600)
+        self.pkgout.message("ESMF TestKit service" +
+            "\n  socket: " + self.sockpath +
+            "\n  workdir: " + self.workdir +
+            "\n  cores: " + str(self.cores))
+        async with server:
+            try:
+                await self.stopped.wait()
+            except asyncio.CancelledError:
+                # interrupted, cancel running jobs so clients are told
+                for job in self.jobs:
+                    job.cancel()
+                await asyncio.gather(*self.jobs, return_exceptions=True)
+                raise
+
+    async def handle(self, reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter):
+        stream = JobStream(writer, asyncio.get_running_loop())
+        rc = 1
+        stop = False
+        try:
+            request = json.loads(await reader.readline())
+            if request.get("command") == "ping":
+                rc = 0
+            elif request.get("command") == "stop":
+                # refuse new submissions and wait for running jobs
+                self.stopping = True
+                stream.write("stopping service - " + self.sockpath + "\n")
+                if len(self.jobs) > 0:
+                    stream.write("waiting for " + str(len(self.jobs)) +
+                        " running job(s)\n")
+                    await asyncio.gather(*self.jobs, return_exceptions=True)
+                stop = True
+                rc = 0
+            elif request.get("command") == "submit":
+                if self.stopping:
+                    stream.write("ERROR: service stopping - " +
+                        self.sockpath + "\n")
+                else:
+                    job = asyncio.current_task()
+                    self.jobs.add(job)
+                    try:
+                        rc = await self.submit(request, stream)
+                    finally:
+                        self.jobs.discard(job)
+            else:
+                stream.write("ERROR: unknown command - " +
+                    str(request.get("command")) + "\n")
+        except (ValueError, AttributeError):
+            stream.write("ERROR: invalid request\n")
+        except SystemExit as exc:
+            stream.write(str(exc.code) + "\n")
+            rc = 1
+        except asyncio.CancelledError:
+            stream.write("ERROR: job cancelled, service stopping - " +
+                self.sockpath + "\n")
+            rc = 1
+        except Exception as exc:
+            stream.write("ERROR: " + type(exc).__name__ + ": " +
+                str(exc) + "\n")
+            rc = 1
+        await asyncio.sleep(0)
+        stream.send({"rc": rc})
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+        if stop:
+            self.stopped.set()
+
+    async def submit(self, request: dict, stream: JobStream):
+        # run a suite in its own warm build tree within the core budget
+        if request.get("workdir") != self.workdir:
+            stream.write("ERROR: service working directory differs - " +
+                self.workdir + "\n")
+            return 1
+        pkgout = PackageOut(request.get("color"), stream)
+        suite = await asyncio.to_thread(TestSuite, request["testsuite"],
+            pkgout, request.get("shard"), request.get("costs"))
+        suite.set_builddir(os.path.join(os.path.dirname(suite.builddir),
+            suite.esmf.mkdigest + "-" + os.path.basename(suite.logdir)))
+        lock = self.locks.setdefault(suite.builddir, asyncio.Lock())
+        if request.get("filter") is not None:
+            suite.check_filter(request.get("filter"))
+        async with lock:
+            history = await asyncio.to_thread(suite.prepare)
+            env = suite.env()
+            with open(suite.logs.logfpath, "w") as logf:
+                logf.write(str(suite.esmf))
+                logf.flush()
+                for step, cmd in suite.build_commands():
+                    # reuse configuration when tests and cmake are unchanged
+                    if (step == "CMake" and not suite.tcfgchanged and
+                            self.warm.get(suite.builddir) == cmd and
+                            os.path.exists(os.path.join(suite.builddir,
+                                "CMakeCache.txt"))):
+                        continue
+                    returncode = await self.spawn(cmd, logf,
+                        suite.builddir, env, 1)
+                    if returncode != 0:
+                        self.warm.pop(suite.builddir, None)
+                        pkgout.abort(step + ' failure detected, see ' +
+                            str(logf.name)
+                        )
+                    if step == "CMake":
+                        self.warm[suite.builddir] = cmd
+            selected, carried, fprints = await asyncio.to_thread(
+                suite.schedule, history, bool(request.get("rerun_failed")),
+                bool(request.get("changed")), request.get("filter"))
+            # tests of one suite run in order, suites share the budget
+            for tname in selected:
+                await asyncio.to_thread(suite.setup_test, tname)
+                with open(suite.logs.test_log(tname), "w") as tlogf:
+                    returncode = await self.spawn(suite.test_command(tname),
+                        tlogf, suite.builddir, env,
+                        suite.testsuite[tname].nprocs())
+                await asyncio.to_thread(suite.finish_test, tname, returncode)
+            output = await asyncio.to_thread(suite.report, selected,
+                carried, fprints)
+            pkgout.message(output)
+        return suite.rc
+
+    async def spawn(self, cmd: list, logf, cwd: str, env: dict,
+            ncores: int):
+        ncores = await self.budget.acquire(ncores)
+        try:
+            proc = await asyncio.create_subprocess_exec(*cmd,
+                stdout=logf, stderr=logf, cwd=cwd, env=env,
+                start_new_session=True)
+            try:
+                return await proc.wait()
+            except asyncio.CancelledError:
+                # stop the whole process group, ctest leaves tests running
+                self.killpg(proc, signal.SIGTERM)
+                try:
+                    await asyncio.wait_for(proc.wait(), 10)
+                except asyncio.TimeoutError:
+                    self.killpg(proc, signal.SIGKILL)
+                    await proc.wait()
+                raise
+        finally:
+            await self.budget.release(ncores)
+
+    @staticmethod
+    def killpg(proc: asyncio.subprocess.Process, sig: int):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            pass
+
+class TestClient():
+
+    def __init__(self, sockpath: str=None, pkgout: PackageOut=None):
+        if pkgout is None:
+            self.pkgout = PackageOut()
+        else:
+            self.pkgout = pkgout
+        if sockpath is None:
+            self.sockpath = default_socket()
+            self.private = True
+        else:
+            self.sockpath = os.path.abspath(sockpath)
+            self.private = False
+
+    def available(self):
+        if not os.path.exists(self.sockpath):
+            return False
+        if self.private and not private_dir(os.path.dirname(self.sockpath)):
+            return False
+        try:
+            return self.request({"command": "ping"}, False) == 0
+        except OSError:
+            return False
+
+    def submit(self, testsuite: str, shard: str=None, costs: str=None,
+            rerun_failed: bool=False, changed: bool=False,
+            tfilter: str=None):
+        request = {"command": "submit",
+                   "workdir": os.getcwd(),
+                   "testsuite": os.path.abspath(testsuite),
+                   "shard": shard,
+                   "costs": costs,
+                   "rerun_failed": rerun_failed,
+                   "changed": changed,
+                   "filter": tfilter,
+                   "color": self.pkgout.colorful}
+        return self.request(request)
+
+    def stop(self):
+        return self.request({"command": "stop"})
+
+    def request(self, request: dict, echo: bool=True):
+        # send request and stream output until return code
+        rc = 1
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.sockpath)
+            sock.sendall(bytes(json.dumps(request) + "\n", 'utf-8'))
+            with sock.makefile("r", encoding="utf-8") as sfile:
+                for line in sfile:
+                    message = json.loads(line)
+                    if "out" in message and echo:
+                        sys.stdout.write(message["out"])
+                        sys.stdout.flush()
+                    if "rc" in message:
+                        rc = int(message["rc"])
+                        break
+        return rc
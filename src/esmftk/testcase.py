@@ -10,6 +10,7 @@ Flight Center. All rights reserved.
 '''
 
 # standard
+import hashlib
 import os
 import shutil
 # local
@@ -55,34 +56,47 @@ class TestCase():
             self.arguments = str(options["arguments"])
         else:
             self.arguments = None
-        self.inputdata = []
-        if "inputdata" in options:
-            if isinstance(options["inputdata"], list):
-                for inputitem in options["inputdata"]:
-                    if isinstance(inputitem, dict):
-                        self.inputdata.append(
-                            Input(inputitem, self.pkgout)
-                        )
-                    elif isinstance(inputitem, str):
-                        self.inputdata.append(
-                            Input.from_string(inputitem, self.pkgout)
-                        )
-                    else:
-                        self.pkgout.abort(
-                            "inputdata format not supported - " + self.name
-                        )
-            elif isinstance(options["inputdata"], dict):
-                self.inputdata.append(
-                    Input(options["inputdata"], self.pkgout)
-                )
-            elif isinstance(options["inputdata"], str):
-                self.inputdata.append(
-                    Input.from_string(options["inputdata"], self.pkgout)
-                )
-            else:
-                self.pkgout.abort(
-                    "inputdata format not supported - " + self.name
-                )
+        # inputdata is resolved when the test is scheduled
+        self._inputdata = None
+        self.inputopts = options.get("inputdata")
+
+    @property
+    def inputdata(self):
+        if self._inputdata is None:
+            self._inputdata = self.load_inputdata(self.inputopts)
+        return self._inputdata
+
+    def load_inputdata(self, inputopts):
+        inputdata = []
+        if inputopts is None:
+            pass
+        elif isinstance(inputopts, list):
+            for inputitem in inputopts:
+                if isinstance(inputitem, dict):
+                    inputdata.append(
+                        Input(inputitem, self.pkgout)
+                    )
+                elif isinstance(inputitem, str):
+                    inputdata.append(
+                        Input.from_string(inputitem, self.pkgout)
+                    )
+                else:
+                    self.pkgout.abort(
+                        "inputdata format not supported - " + self.name
+                    )
+        elif isinstance(inputopts, dict):
+            inputdata.append(
+                Input(inputopts, self.pkgout)
+            )
+        elif isinstance(inputopts, str):
+            inputdata.append(
+                Input.from_string(inputopts, self.pkgout)
+            )
+        else:
+            self.pkgout.abort(
+                "inputdata format not supported - " + self.name
+            )
+        return inputdata
 
     def write_cmake(self, tcfgdir: str):
         # generate <test>.cmake file
@@ -116,9 +130,22 @@ class TestCase():
         output += ('set_tests_properties(' + self.name + ' PROPERTIES' +
                    ' TIMEOUT ' + str(self.timeout) + ')\n')
         output += 'unset(TEST_EXE)\n'
+        # leave unchanged files alone so cmake does not reconfigure
         fpath = os.path.abspath(os.path.join(tcfgdir, self.cmakef))
+        if os.path.exists(fpath):
+            with open(fpath, "r") as cmakef:
+                if cmakef.read() == output:
+                    return False
         with open(fpath, "w") as cmakef:
             cmakef.write(output)
+        return True
+
+    def nprocs(self):
+        # number of cores used by the test
+        try:
+            return max(int(self.mpinp), 1)
+        except ValueError:
+            return 1
 
     def clean_tdir(self):
         if os.path.exists(self.tdir):
@@ -129,5 +156,17 @@ class TestCase():
         for inputitem in self.inputdata:
             inputitem.setup(self.tdir)
 
+    def fingerprint(self, exepath: str=None, context: str=None):
+        # digest of resolved options, input data and executable
+        hasher = hashlib.shake_256()
+        settings = [self.exe, self.exedir, self.mpi, self.mpinp,
+            self.timeout, self.arguments, context]
+        hasher.update(bytes(repr(settings), 'utf-8'))
+        for inputitem in self.inputdata:
+            hasher.update(bytes(inputitem.fingerprint(), 'utf-8'))
+        if exepath is not None and os.path.isfile(exepath):
+            hasher.update(bytes(file_digest(exepath), 'utf-8'))
+        return hasher.hexdigest(8)
+
     def __str__(self):
         return self.name
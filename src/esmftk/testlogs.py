@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+'''
+ESMF TestKit (esmftk)
+
+Copyright (c) 2002-2025 University Corporation for Atmospheric Research,
+Massachusetts Institute of Technology, Geophysical Fluid Dynamics Laboratory,
+University of Michigan, National Centers for Environmental Prediction, Los
+Alamos National Laboratory, Argonne National Laboratory, NASA Goddard Space
+Flight Center. All rights reserved.
+'''
+
+# standard
+from datetime import datetime as dt
+from datetime import timedelta
+import fnmatch
+import gzip
+import os
+import re
+import shutil
+import tarfile
+# third party (optional)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+# local
+from .packageout import *
+
+class TestLogs():
+
+    compressext = {"gzip": ".gz", "zstd": ".zst"}
+    petpatterns = ["*ESMF_LogFile", "ESMF_Profile.*"]
+    petexclude = ["ESMF_Profile.summary"]
+    runpattern = re.compile(
+        r"^(output|results|tests)-" +
+        r"(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})" +
+        r"(-(?P<count>\d+))?(\.|$)"
+    )
+
+    def __init__(self, logdir: str, options: dict=None,
+            pkgout: PackageOut=None):
+        if pkgout is None:
+            self.pkgout = PackageOut()
+        else:
+            self.pkgout = pkgout
+        self.logdir = os.path.abspath(logdir)
+        self.logfpath = os.path.join(self.logdir, "output-latest")
+        self.resfpath = os.path.join(self.logdir, "results-latest.xml")
+        self.tlogdir = os.path.join(self.logdir, "tests-latest")
+        self.compress = None
+        self.keep = None
+        self.days = None
+        if options is None:
+            return
+        if not isinstance(options, dict):
+            self.pkgout.abort('testsuite configuration error - logs')
+        if "compress" in options:
+            if isinstance(options["compress"], bool):
+                if options["compress"]:
+                    self.compress = "gzip"
+            elif options["compress"] is not None:
+                self.compress = str(options["compress"]).lower()
+                if self.compress in ["none", "off"]:
+                    self.compress = None
+                elif self.compress not in self.compressext:
+                    self.pkgout.abort('logs compression not supported - ' +
+                        str(options["compress"])
+                    )
+                elif self.compress == "zstd" and zstandard is None:
+                    self.pkgout.abort('logs compression requires ' +
+                        'zstandard package - ' + self.compress
+                    )
+        try:
+            if "keep" in options and options["keep"] is not None:
+                self.keep = int(options["keep"])
+            if "days" in options and options["days"] is not None:
+                self.days = float(options["days"])
+        except (TypeError, ValueError):
+            self.pkgout.abort('testsuite configuration error - logs')
+        if self.keep is not None:
+            if self.keep < 0:
+                self.pkgout.abort('logs keep must be >= 0 - ' +
+                    str(options["keep"])
+                )
+        if self.days is not None:
+            if self.days < 0:
+                self.pkgout.abort('logs days must be >= 0 - ' +
+                    str(options["days"])
+                )
+
+    def rotate(self):
+        # move previous latest logs aside using a single run timestamp
+        os.makedirs(self.logdir, exist_ok=True)
+        latest = [fpath for fpath in [self.logfpath, self.resfpath,
+            self.tlogdir] if os.path.exists(fpath)]
+        if len(latest) > 0:
+            ts = max(os.path.getmtime(fpath) for fpath in latest)
+            tsiso = dt.fromtimestamp(ts).replace(microsecond=0).isoformat()
+            runid = tsiso
+            runs = self.list_runs()
+            counts = [count for rts, count in runs if rts == tsiso]
+            if len(counts) > 0:
+                runid = tsiso + "-" + str(max(counts) + 1)
+            for fpath in latest:
+                newfpath = os.path.join(self.logdir,
+                    os.path.basename(fpath).replace("latest", runid))
+                os.rename(fpath, newfpath)
+                if fpath == self.logfpath and self.compress is not None:
+                    self.compress_file(newfpath)
+        os.makedirs(self.tlogdir, exist_ok=True)
+        self.prune()
+
+    def list_runs(self):
+        # map (timestamp, counter) of rotated runs to their files
+        runs = {}
+        for fname in os.listdir(self.logdir):
+            match = self.runpattern.match(fname)
+            if match is None:
+                continue
+            runid = (match.group("ts"), int(match.group("count") or 0))
+            runs.setdefault(runid, []).append(
+                os.path.join(self.logdir, fname)
+            )
+        return runs
+
+    def prune(self):
+        # remove timestamped logs beyond the retention policy
+        if self.keep is None and self.days is None:
+            return
+        runs = self.list_runs()
+        expired = set()
+        runlist = sorted(runs, reverse=True)
+        if self.keep is not None:
+            expired.update(runlist[self.keep:])
+        if self.days is not None:
+            cutoff = dt.now() - timedelta(days=self.days)
+            for runid in runlist:
+                if dt.fromisoformat(runid[0]) < cutoff:
+                    expired.add(runid)
+        for runid in expired:
+            for fpath in runs[runid]:
+                if os.path.isdir(fpath):
+                    shutil.rmtree(fpath)
+                else:
+                    os.remove(fpath)
+
+    def test_log(self, tname: str):
+        return os.path.join(self.tlogdir, tname + ".log")
+
+    def test_results(self, tname: str):
+        return os.path.join(self.tlogdir, tname + ".xml")
+
+    def finalize_test(self, tname: str, tdir: str):
+        # compress test output and bundle PET logs after each test
+        tlog = self.test_log(tname)
+        if self.compress is None:
+            return tlog
+        if os.path.exists(tlog):
+            self.compress_file(tlog)
+            tlog += self.compressext[self.compress]
+        petfiles = []
+        if os.path.isdir(tdir):
+            for fname in sorted(os.listdir(tdir)):
+                if fname in self.petexclude:
+                    continue
+                if any(fnmatch.fnmatch(fname, p) for p in self.petpatterns):
+                    petfiles.append(os.path.join(tdir, fname))
+        if len(petfiles) > 0:
+            self.archive_files(petfiles,
+                os.path.join(self.tlogdir, tname + "-petlogs.tar"))
+        return tlog
+
+    def finalize_results(self, tnames: list):
+        # per-test results are merged into results-latest.xml
+        if self.compress is None:
+            return
+        for tname in tnames:
+            tresfpath = self.test_results(tname)
+            if os.path.exists(tresfpath):
+                os.remove(tresfpath)
+
+    def open_compressed(self, fpath: str):
+        if self.compress == "gzip":
+            return gzip.open(fpath + self.compressext["gzip"], "wb")
+        elif self.compress == "zstd":
+            ofile = open(fpath + self.compressext["zstd"], "wb")
+            return zstandard.ZstdCompressor().stream_writer(ofile)
+        else:
+            self.pkgout.abort("unknown logs compression " + self.compress)
+
+    def compress_file(self, fpath: str):
+        with open(fpath, "rb") as ifile:
+            with self.open_compressed(fpath) as ofile:
+                shutil.copyfileobj(ifile, ofile)
+        os.remove(fpath)
+
+    def archive_files(self, fpaths: list, tarpath: str):
+        with self.open_compressed(tarpath) as ofile:
+            with tarfile.open(fileobj=ofile, mode="w|") as tfile:
+                for fpath in fpaths:
+                    tfile.add(fpath, arcname=os.path.basename(fpath))
+        for fpath in fpaths:
+            os.remove(fpath)
+
+    def __str__(self):
+        msg = ("Logs Information" +
+            "\n  logdir: " + self.logdir +
+            "\n  compress: " + str(self.compress) +
+            "\n  keep: " + str(self.keep) +
+            "\n  days: " + str(self.days) +
+            "\n")
+        return msg
@@ -10,6 +10,9 @@ Flight Center. All rights reserved.
 '''
 
 # standard
+from datetime import datetime as dt
+import os
+import socket
 import xml.etree.ElementTree as ET
 # local
 from .esmfinstall import *
@@ -25,8 +28,8 @@ class CsvStr(str):
 
 class TestResults():
 
-    def __init__(self, resfile: str, testsuite: dict, esmf: ESMFInstallation,
-            pkgout: PackageOut=None):
+    def __init__(self, resfile: str, testsuite: dict=None,
+            esmf: ESMFInstallation=None, pkgout: PackageOut=None):
         if PackageOut is None:
             self.pkgout = PackageOut()
         else:
@@ -34,22 +37,234 @@ class TestResults():
         self.tests = []
         self.append(resfile, testsuite, esmf)
 
-    def append(self, resfile: str, testsuite: dict, esmf: ESMFInstallation):
+    def append(self, resfile: str, testsuite: dict=None,
+            esmf: ESMFInstallation=None):
+        # without testsuite and esmf use properties stored in resfile
+        if not os.path.exists(resfile):
+            self.pkgout.abort('results file not found - ' + resfile)
         tree = ET.parse(resfile)
         root = tree.getroot()
         hostname = root.get('hostname')
         timestamp = root.get('timestamp')
-        for tname, tcase in testsuite.items():
+        props = self.properties(root)
+        if esmf is None:
+            esmfvers = props.get('esmftk.esmf', 'unknown')
+        else:
+            esmfvers = esmf.vers
+        if testsuite is None:
+            tnames = self.expected(resfile)
+        else:
+            tnames = list(testsuite)
+        for tname in tnames:
             tres = root.find(".//testcase[@name='" + tname + "']")
+            if tres is None:
+                self.pkgout.warning('results not found - ' + tname)
+                tres = ET.Element("testcase", {"name": tname,
+                    "status": "notrun", "time": "0"})
+            tprops = self.properties(tres)
+            if testsuite is None:
+                mpi = tprops.get('esmftk.mpi', '-')[0]
+                mpinp = tprops.get('esmftk.mpinp', '-')
+            else:
+                mpi = str(testsuite[tname].mpi)[0]
+                mpinp = testsuite[tname].mpinp
             self.tests.append({"name": tres.get('name'),
-                               "hostname": hostname,
-                               "esmfvers": esmf.vers,
-                               "timestamp": timestamp,
-                               "mpi": str(tcase.mpi)[0],
-                               "mpinp": tcase.mpinp,
+                               "hostname": tprops.get('esmftk.hostname',
+                                   hostname),
+                               "esmfvers": esmfvers,
+                               "timestamp": tprops.get('esmftk.timestamp',
+                                   timestamp),
+                               "mpi": mpi,
+                               "mpinp": mpinp,
                                "status": tres.get('status'),
                                "time": float(tres.get('time'))})
 
+    @classmethod
+    def gather(cls, resfiles: list, outfile: str=None,
+            pkgout: PackageOut=None):
+        # combine self-describing shard results into a single report
+        # sets complete to False when shards are missing
+        if pkgout is None:
+            pkgout = PackageOut()
+        shards = {}
+        partitions = {}
+        gathered = []
+        for resfile in resfiles:
+            if not os.path.exists(resfile):
+                pkgout.abort('results file not found - ' + resfile)
+            props = cls.properties(ET.parse(resfile).getroot())
+            shard = props.get("esmftk.shard")
+            if shard is None or "/" not in shard:
+                pkgout.warning('results missing shard information - ' +
+                    resfile)
+                gathered.append(resfile)
+                continue
+            index, count = shard.split("/", maxsplit=1)
+            suite = props.get("esmftk.suite")
+            indices = shards.setdefault((suite, count), [])
+            if int(index) in indices:
+                pkgout.warning('duplicate shard ' + shard + ' for ' +
+                    str(suite) + ' ignored - ' + resfile)
+                continue
+            partition = props.get("esmftk.partition")
+            if partitions.setdefault((suite, count), partition) != partition:
+                pkgout.abort('shards of ' + str(suite) + ' were ' +
+                    'partitioned differently, use the same --costs ' +
+                    'for every shard - ' + resfile)
+            indices.append(int(index))
+            gathered.append(resfile)
+        complete = True
+        for resfile in gathered:
+            root = ET.parse(resfile).getroot()
+            found = [tres.get('name') for tres in root.findall('testcase')]
+            if not set(cls.expected(resfile)).issubset(found):
+                complete = False
+        for (suite, count), indices in shards.items():
+            missing = set(range(1, int(count) + 1)) - set(indices)
+            if len(missing) > 0:
+                pkgout.warning('missing shards for ' + str(suite) + ' - ' +
+                    ", ".join(str(i) + "/" + count for i in sorted(missing)))
+                complete = False
+        results = cls(gathered[0], pkgout=pkgout)
+        for resfile in gathered[1:]:
+            results.append(resfile)
+        results.complete = complete
+        if outfile is not None:
+            cls.merge(gathered, outfile)
+            tree = ET.parse(outfile)
+            root = tree.getroot()
+            cls._set_properties(root, {"esmftk.shard": "gathered",
+                "esmftk.tests": ",".join(t["name"] for t in results.tests)},
+                0)
+            tree.write(outfile, encoding="UTF-8", xml_declaration=True)
+        return results
+
+    def failed(self):
+        # tests that did not run count as failures
+        return any(t["status"] in ["fail", "notrun"] for t in self.tests)
+
+    @staticmethod
+    def expected(resfile: str):
+        # test names listed in esmftk.tests followed by any other testcases
+        root = ET.parse(resfile).getroot()
+        tnames = [tres.get('name') for tres in root.findall('testcase')]
+        tests = TestResults.properties(root).get('esmftk.tests')
+        if tests is None or len(tests) == 0:
+            return tnames
+        expected = tests.split(",")
+        return expected + [t for t in tnames if t not in expected]
+
+    @staticmethod
+    def properties(element: ET.Element):
+        props = {}
+        for prop in element.findall("properties/property"):
+            props[prop.get("name")] = prop.get("value")
+        return props
+
+    @staticmethod
+    def durations(resfile: str):
+        # map test names to run times from a previous results file
+        times = {}
+        root = ET.parse(resfile).getroot()
+        for tres in root.findall("testcase"):
+            if tres.get("time") is not None:
+                times[tres.get("name")] = float(tres.get("time"))
+        return times
+
+    @staticmethod
+    def describe(resfile: str, suite: str, shard: str, testsuite: dict,
+            esmf: ESMFInstallation, fingerprints: dict=None,
+            partition: str=None):
+        # store suite, shard and test settings so results are self-describing
+        tree = ET.parse(resfile)
+        root = tree.getroot()
+        sprops = {"esmftk.suite": suite,
+                  "esmftk.shard": shard,
+                  "esmftk.esmf": esmf.vers,
+                  "esmftk.tests": ",".join(testsuite)}
+        if partition is not None:
+            sprops["esmftk.partition"] = partition
+        TestResults._set_properties(root, sprops, 0)
+        for tname, tcase in testsuite.items():
+            tres = root.find("testcase[@name='" + tname + "']")
+            if tres is None:
+                continue
+            tprops = {"esmftk.mpi": str(tcase.mpi),
+                      "esmftk.mpinp": tcase.mpinp}
+            if fingerprints is not None and tname in fingerprints:
+                tprops["esmftk.fingerprint"] = fingerprints[tname]
+                tprops["esmftk.carried"] = "False"
+            TestResults._set_properties(tres, tprops, 0)
+        tree.write(resfile, encoding="UTF-8", xml_declaration=True)
+
+    @staticmethod
+    def _set_properties(element: ET.Element, props: dict, index: int):
+        pelem = element.find("properties")
+        if pelem is None:
+            pelem = ET.Element("properties")
+            element.insert(index, pelem)
+        for name, value in props.items():
+            prop = pelem.find("property[@name='" + name + "']")
+            if prop is None:
+                prop = ET.SubElement(pelem, "property", {"name": name})
+            prop.set("value", str(value))
+
+    @staticmethod
+    def history(resfile: str):
+        # map test names to testcase elements from a previous results file
+        tests = {}
+        if resfile is None or not os.path.exists(resfile):
+            return tests
+        root = ET.parse(resfile).getroot()
+        for tres in root.findall("testcase"):
+            # keep where and when the test originally ran
+            tprops = TestResults.properties(tres)
+            origin = {}
+            for attr in ["hostname", "timestamp"]:
+                if ("esmftk." + attr) not in tprops and root.get(attr):
+                    origin["esmftk." + attr] = root.get(attr)
+            if len(origin) > 0:
+                TestResults._set_properties(tres, origin, 0)
+            tests[tres.get("name")] = tres
+        return tests
+
+    @staticmethod
+    def merge(resfiles: list, outfile: str, carried: list=None):
+        # combine per-test junit files into a single testsuite
+        # carried testcase elements are copied from previous results
+        base = None
+        for resfile in resfiles:
+            if not os.path.exists(resfile):
+                continue
+            root = ET.parse(resfile).getroot()
+            if base is None:
+                base = root
+                continue
+            for attr in ["tests", "failures", "disabled", "skipped"]:
+                if root.get(attr) is not None:
+                    base.set(attr, str(int(base.get(attr, "0")) +
+                        int(root.get(attr))))
+            if root.get("time") is not None:
+                base.set("time", str(float(base.get("time", "0")) +
+                    float(root.get("time"))))
+            for tres in root.findall("testcase"):
+                base.append(tres)
+        if base is None:
+            base = ET.Element("testsuite", {"tests": "0", "failures": "0",
+                "hostname": socket.gethostname(),
+                "timestamp": dt.now().replace(microsecond=0).isoformat()})
+        if carried is not None:
+            for tres in carried:
+                base.set("tests", str(int(base.get("tests", "0")) + 1))
+                if tres.get("status") == "fail":
+                    base.set("failures",
+                        str(int(base.get("failures", "0")) + 1))
+                TestResults._set_properties(tres,
+                    {"esmftk.carried": "True"}, 0)
+                base.append(tres)
+        ET.ElementTree(base).write(outfile, encoding="UTF-8",
+            xml_declaration=True)
+
     def csv(self):
         res = (f"name," +
                f"hostname," +
@@ -10,21 +10,29 @@ Flight Center. All rights reserved.
 '''
 
 # standard
-from datetime import datetime as dt
 from importlib.resources import files
+import hashlib
+import json
 import os
+import re
 import subprocess
 # third party
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 # local
 from .esmfinstall import *
 from .packageout import *
 from .testcase import *
+from .testlogs import *
 from .testresult import *
 
 class TestSuite():
 
-    def __init__(self, filepath: str, pkgout: PackageOut=None):
+    def __init__(self, filepath: str, pkgout: PackageOut=None,
+            shard: str=None, costs: str=None):
         if PackageOut is None:
             self.pkgout = PackageOut()
         else:
@@ -34,7 +42,7 @@ class TestSuite():
         if not os.path.exists(self.filepath):
             self.pkgout.abort('File not found - ' + self.filepath)
         with open(self.filepath) as file:
-            config = yaml.safe_load(file)
+            config = yaml.load(file, Loader=SafeLoader)
             if config is None:
                 self.pkgout.abort('File is empty - ' + self.filepath)
         # read test name
@@ -49,12 +57,26 @@ class TestSuite():
             else:
                 self.pkgout.warning('Using ESMFMKFILE environment variable')
                 config["esmf"] = os.environ['ESMFMKFILE']
-        self.esmf = ESMFInstallation(config["esmf"])
+        self.esmf = ESMFInstallation.cached(config["esmf"], self.pkgout)
+        # read shard selection
+        self.shard = None
+        self.partition = None
+        if shard is not None:
+            match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", str(shard))
+            if match is None:
+                self.pkgout.abort('shard format must be i/N - ' + str(shard))
+            self.shard = (int(match.group(1)), int(match.group(2)))
+            if self.shard[1] < 1 or not 1 <= self.shard[0] <= self.shard[1]:
+                self.pkgout.abort('shard out of range - ' + str(shard))
         # define directories
+        bname = self.esmf.mkdigest
+        lname = self.name
+        if self.shard is not None:
+            bname += "-shard{}of{}".format(*self.shard)
+            lname += "-shard{}of{}".format(*self.shard)
         self.builddir = os.path.abspath(os.path.join("build", self.esmf.vers,
-                                                     self.esmf.mkdigest))
+                                                     bname))
         self.testdir = os.path.abspath(os.path.join("run", self.name))
-        self.logdir = os.path.abspath(os.path.join("logs", self.name))
         self.tcfgdir = os.path.abspath(os.path.join(self.builddir, "testcfg"))
         self.buildwrp = files(__package__).joinpath('wrapper')
         # read testsuite
@@ -73,6 +95,8 @@ class TestSuite():
                 else:
                     self.testsuite[tname] = TestCase(tname,
                         opts, self.testdir, self.pkgout)
+        if self.shard is not None:
+            self.shard_tests(self.shard[0], self.shard[1], costs)
         # read profile
         self.profile = "SUMMARY"
         if "profile" in config:
@@ -93,6 +117,10 @@ class TestSuite():
                     self.resultsfmt = str(config["results"]["format"]).lower()
             else:
                 self.pkgout.abort('testsuite configuration error - results')
+        # log capture, compression and retention
+        self.logs = TestLogs(os.path.join("logs", lname),
+            config.get("logs"), self.pkgout)
+        self.logdir = self.logs.logdir
         # read src directory for tests
         self.testbuild = True
         self.testsrc = files(__package__).joinpath('tests')
@@ -109,74 +137,238 @@ class TestSuite():
             else:
                 self.pkgout.abort('testsuite configuration error - tests')
 
-    def test_list(self):
-        tl = ""
-        for t in self.testsuite:
-            tl += t + "|"
-        return tl.rstrip("|")
+    def shard_tests(self, index: int, count: int, costs: str=None):
+        # deterministic longest-processing-time partition of the tests
+        # cost is mpinp times historical duration, or timeout if unknown
+        durations = {}
+        if costs is not None:
+            if not os.path.exists(costs):
+                self.pkgout.abort('costs file not found - ' + costs)
+            durations = TestResults.durations(costs)
+        tcost = {}
+        for tname, tcase in self.testsuite.items():
+            if tname in durations:
+                duration = durations[tname]
+            elif tcase.timeout > 0:
+                duration = tcase.timeout
+            else:
+                duration = 1.0
+            tcost[tname] = tcase.nprocs() * duration
+        # digest of partition inputs so gather can detect mismatched shards
+        hasher = hashlib.shake_256()
+        hasher.update(bytes(repr([count, sorted(tcost.items())]), 'utf-8'))
+        self.partition = hasher.hexdigest(8)
+        load = [0.0] * count
+        selected = {}
+        for tname in sorted(tcost, key=lambda t: (-tcost[t], t)):
+            sindex = min(range(count), key=lambda i: (load[i], i))
+            load[sindex] += tcost[tname]
+            if sindex == index - 1:
+                selected[tname] = self.testsuite[tname]
+        self.testsuite = {t: c for t, c in self.testsuite.items()
+                          if t in selected}
+
+    def shard_str(self):
+        if self.shard is None:
+            return "1/1"
+        return "{}/{}".format(*self.shard)
+
+    def env(self):
+        # environment for build and test subprocesses
+        env = dict(os.environ)
+        env.update(self.esmf.env())
+        if self.profile is not None:
+            env["ESMF_RUNTIME_PROFILE"] = "ON"
+            env["ESMF_RUNTIME_PROFILE_OUTPUT"] = self.profile
+        return env
+
+    def set_builddir(self, builddir: str):
+        self.builddir = os.path.abspath(builddir)
+        self.tcfgdir = os.path.abspath(os.path.join(self.builddir, "testcfg"))
+
+    def test_commands(self):
+        # map test names to commands as resolved by ctest
+        cp = subprocess.run(["ctest", "--show-only=json-v1"],
+            capture_output=True, text=True, cwd=self.builddir,
+            env=self.env())
+        commands = {}
+        if cp.returncode != 0:
+            return commands
+        try:
+            tinfo = json.loads(cp.stdout)
+        except json.JSONDecodeError:
+            return commands
+        for test in tinfo.get("tests", []):
+            commands[test.get("name")] = test.get("command", [])
+        return commands
 
-    def run(self):
+    def fingerprints(self, tnames: list):
+        # fingerprint tests using their resolved executables
+        context = [self.esmf.mkdigest, self.profile]
+        commands = self.test_commands()
+        fprints = {}
+        for tname in tnames:
+            tcase = self.testsuite[tname]
+            exepath = None
+            for arg in commands.get(tname, []):
+                if os.path.basename(arg) == tcase.exe:
+                    exepath = arg
+                    break
+            fprints[tname] = tcase.fingerprint(exepath, repr(context))
+        return fprints
+
+    def select_tests(self, history: dict, fprints: dict,
+            rerun_failed: bool=False, changed: bool=False,
+            tfilter: str=None):
+        # select tests to run, all tests when no selection mode is set
+        if rerun_failed or changed:
+            selected = set()
+            for tname in self.testsuite:
+                tres = history.get(tname)
+                if tres is None or tres.get("status") != "run":
+                    selected.add(tname)
+                elif changed:
+                    tprops = TestResults.properties(tres)
+                    if tprops.get("esmftk.fingerprint") != fprints[tname]:
+                        selected.add(tname)
+            if rerun_failed and len(history) == 0:
+                self.pkgout.warning('no previous results, running all tests')
+        else:
+            selected = set(self.testsuite)
+        if tfilter is not None:
+            tpattern = self.check_filter(tfilter)
+            selected = {t for t in selected if tpattern.search(t)}
+        return [t for t in self.testsuite if t in selected]
+
+    def check_filter(self, tfilter: str):
+        # validate before logs are rotated or anything is built
+        try:
+            return re.compile(tfilter)
+        except re.error:
+            self.pkgout.abort('invalid filter - ' + tfilter)
+
+    def prepare(self):
+        # create directories, rotate logs and write test configuration
+        # returns previous results used for selection and carry forward
         self.rc = 0
-        self.esmf.setenv()
         os.makedirs(self.builddir, exist_ok=True)
         os.makedirs(self.testdir, exist_ok=True)
         os.makedirs(self.tcfgdir, exist_ok=True)
-        os.makedirs(self.logdir, exist_ok=True)
+        self.tcfgchanged = False
+        cmakefs = [tcase.cmakef for tcase in self.testsuite.values()]
         for filename in os.listdir(self.tcfgdir):
-            filepath = os.path.join(self.tcfgdir, filename)
-            os.remove(filepath)
-        logfpath = "{}/output-latest".format(self.logdir)
-        resfpath = "{}/results-latest.xml".format(self.logdir)
-        if os.path.exists(logfpath):
-            ts = os.path.getmtime(logfpath)
-            tsiso = dt.fromtimestamp(ts).replace(microsecond=0).isoformat()
-            os.rename(logfpath, logfpath.replace("latest", tsiso))
-        if os.path.exists(resfpath):
-            ts = os.path.getmtime(resfpath)
-            tsiso = dt.fromtimestamp(ts).replace(microsecond=0).isoformat()
-            os.rename(resfpath, resfpath.replace("latest", tsiso))
-        if self.profile is not None:
-            os.environ["ESMF_RUNTIME_PROFILE"] = "ON"
-            os.environ["ESMF_RUNTIME_PROFILE_OUTPUT"] = self.profile
+            if filename not in cmakefs:
+                os.remove(os.path.join(self.tcfgdir, filename))
+                self.tcfgchanged = True
         for tname in self.testsuite:
-            self.testsuite[tname].write_cmake(self.tcfgdir)
-            self.testsuite[tname].clean_tdir()
-            self.testsuite[tname].setup_input()
-        with open(logfpath, "w") as logf:
-            logf.write(str(self.esmf))
-            logf.flush()
-            if self.testbuild:
-                cp = subprocess.run(["cmake", self.buildwrp,
-                    "-DESMFTK_TESTS_SRC=" + str(self.testsrc)],
-                    stdout=logf, stderr=logf, cwd=self.builddir)
-            else:
-                cp = subprocess.run(["cmake", self.buildwrp],
-                    stdout=logf, stderr=logf, cwd=self.builddir)
-            if cp.returncode != 0:
-                self.pkgout.abort('CMake failure detected, see ' +
-                    str(logf.name)
-                )
-            cp = subprocess.run(["make"],
-                stdout=logf, stderr=logf, cwd=self.builddir)
-            if cp.returncode != 0:
-                self.pkgout.abort('Make failure detected, see ' +
-                    str(logf.name)
-                )
-            cp = subprocess.run(["ctest", "-R", self.test_list(),
-                "--output-junit", resfpath],
-                stdout=logf, stderr=logf, cwd=self.builddir)
-            if cp.returncode != 0:
-                self.pkgout.error('CTest failure detected, see ' +
-                    str(logf.name)
-                )
-                self.rc = 101
-        # read and print test results
+            if self.testsuite[tname].write_cmake(self.tcfgdir):
+                self.tcfgchanged = True
+        history = TestResults.history(self.logs.resfpath)
+        self.logs.rotate()
+        return history
+
+    def build_commands(self):
+        if self.testbuild:
+            cmake = ["cmake", str(self.buildwrp),
+                "-DESMFTK_TESTS_SRC=" + str(self.testsrc)]
+        else:
+            cmake = ["cmake", str(self.buildwrp), "-UESMFTK_TESTS_SRC"]
+        return [("CMake", cmake), ("Make", ["make"])]
+
+    def schedule(self, history: dict, rerun_failed: bool=False,
+            changed: bool=False, tfilter: str=None):
+        # select tests and carry forward results for skipped tests
+        fprints = None
+        if changed:
+            fprints = self.fingerprints(list(self.testsuite))
+        selected = self.select_tests(history, fprints, rerun_failed,
+            changed, tfilter)
+        if fprints is None:
+            fprints = self.fingerprints(selected)
+        carried = [history[t] for t in self.testsuite
+                   if t not in selected and t in history]
+        if any(tres.get("status") == "fail" for tres in carried):
+            self.rc = 101
+        return selected, carried, fprints
+
+    def setup_test(self, tname: str):
+        self.testsuite[tname].clean_tdir()
+        self.testsuite[tname].setup_input()
+
+    def test_command(self, tname: str):
+        return ["ctest", "-V",
+            "-R", "^" + re.escape(tname) + "$",
+            "--output-junit", self.logs.test_results(tname)]
+
+    def finish_test(self, tname: str, returncode: int):
+        # report each result as soon as the test completes
+        tres = TestResults.history(self.logs.test_results(tname)).get(tname)
+        if tres is None:
+            status = "notrun"
+            ttime = 0.0
+        else:
+            status = tres.get("status")
+            ttime = float(tres.get("time", 0))
+        self.pkgout.message("RESULT: " + tname + " " + str(status) +
+            " " + f"{ttime:.3E}" + " s")
+        tlogfpath = self.logs.finalize_test(tname, self.testsuite[tname].tdir)
+        if returncode != 0:
+            self.pkgout.error('CTest failure detected, see ' +
+                str(tlogfpath)
+            )
+            self.rc = 101
+
+    def report(self, selected: list, carried: list, fprints: dict):
+        resfpath = self.logs.resfpath
+        TestResults.merge([self.logs.test_results(t) for t in selected],
+            resfpath, carried)
+        self.logs.finalize_results(selected)
+        TestResults.describe(resfpath, self.name, self.shard_str(),
+            self.testsuite, self.esmf,
+            {t: fprints[t] for t in selected}, self.partition)
+        # read and format test results
         results = TestResults(resfpath, self.testsuite, self.esmf,
             self.pkgout
         )
         if self.resultsfmt == "csv":
-            print(results.csv())
+            output = results.csv()
         else:
-            print(results.markdown())
-        print("\nFINISHED: " + self.name + " (" + str(logf.name) + ")")
+            output = results.markdown()
+        if len(carried) > 0:
+            nfail = sum(1 for t in carried if t.get("status") == "fail")
+            output += ("\n\nSKIPPED: " + str(len(carried)) +
+                " test(s) carried forward from previous results")
+            if nfail > 0:
+                output += (" (" + str(nfail) + " failed," +
+                    " included in return code)")
+        output += ("\n\nFINISHED: " + self.name +
+            " (" + str(self.logs.logfpath) + ")")
+        return output
+
+    def run(self, rerun_failed: bool=False, changed: bool=False,
+            tfilter: str=None):
+        if tfilter is not None:
+            self.check_filter(tfilter)
+        history = self.prepare()
+        env = self.env()
+        with open(self.logs.logfpath, "w") as logf:
+            logf.write(str(self.esmf))
+            logf.flush()
+            for step, cmd in self.build_commands():
+                cp = subprocess.run(cmd,
+                    stdout=logf, stderr=logf, cwd=self.builddir, env=env)
+                if cp.returncode != 0:
+                    self.pkgout.abort(step + ' failure detected, see ' +
+                        str(logf.name)
+                    )
+        selected, carried, fprints = self.schedule(history, rerun_failed,
+            changed, tfilter)
+        # run each test separately to capture per-test output
+        for tname in selected:
+            self.setup_test(tname)
+            with open(self.logs.test_log(tname), "w") as tlogf:
+                cp = subprocess.run(self.test_command(tname),
+                    stdout=tlogf, stderr=tlogf, cwd=self.builddir, env=env)
+            self.finish_test(tname, cp.returncode)
+        self.pkgout.message(self.report(selected, carried, fprints))
         return self.rc
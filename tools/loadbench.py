@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+ESMF TestKit (esmftk)
+
+Copyright (c) 2002-2025 University Corporation for Atmospheric Research,
+Massachusetts Institute of Technology, Geophysical Fluid Dynamics Laboratory,
+University of Michigan, National Centers for Environmental Prediction, Los
+Alamos National Laboratory, Argonne National Laboratory, NASA Goddard Space
+Flight Center. All rights reserved.
+
+Startup benchmark: time loading a synthetic test suite.
+'''
+
+# standard
+import argparse
+import os
+import sys
+import tempfile
+import time
+# local
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    os.pardir, "src"))
+from esmftk.packageout import PackageOut
+from esmftk.testsuite import TestSuite
+
+ESMFMK = '''ESMF_VERSION_MAJOR=8
+ESMF_VERSION_MINOR=8
+ESMF_VERSION_REVISION=0
+ESMF_VERSION_PUBLIC='T'
+ESMF_VERSION_STRING=8.8.0
+ESMF_VERSION_STRING_GIT=v8.8.0
+ESMF_VERSION_BETASNAPSHOT='F'
+'''
+
+TESTCASE = '''    test{0:05d}:
+        executable: esmf_reconcile
+        inputdata:
+            type: template
+            infile: templates/reconcile.cfg
+            vars: {{ compCount: 2, iterationCount: 1, fieldCount: {1} }}
+        arguments: reconcile.cfg
+        timeout: 60
+        mpinp: {2}
+'''
+
+def write_suite(dirpath: str, ntests: int):
+    mkfile = os.path.join(dirpath, "esmf.mk")
+    with open(mkfile, "w") as file:
+        file.write(ESMFMK)
+    suitefile = os.path.join(dirpath, "suite.yml")
+    with open(suitefile, "w") as file:
+        file.write('name: "loadbench"\n')
+        file.write('esmf: ' + mkfile + '\n')
+        file.write('testsuite:\n')
+        for i in range(ntests):
+            file.write(TESTCASE.format(i, 100 + i % 100, 4 << (i % 4)))
+    return suitefile
+
+def RunLoadBench(argv):
+    parser = argparse.ArgumentParser(prog="loadbench")
+    parser.add_argument('--tests', type=int, default=10000,
+        help='number of tests in the synthetic suite (default: 10000)'
+    )
+    parser.add_argument('--repeat', type=int, default=3,
+        help='number of timed loads, best is reported (default: 3)'
+    )
+    args = parser.parse_args(argv)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        suitefile = write_suite(tmpdir, args.tests)
+        # relative infile paths resolve against the package
+        os.chdir(tmpdir)
+        try:
+            times = []
+            for i in range(args.repeat):
+                start = time.perf_counter()
+                TestSuite(suitefile, PackageOut())
+                times.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+    print("tests: " + str(args.tests) +
+          " best: " + f"{min(times):.3f}" + " s" +
+          " mean: " + f"{sum(times) / len(times):.3f}" + " s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(RunLoadBench(sys.argv[1:]))
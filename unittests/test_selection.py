@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+'''
+ESMF TestKit (esmftk)
+
+Copyright (c) 2002-2025 University Corporation for Atmospheric Research,
+Massachusetts Institute of Technology, Geophysical Fluid Dynamics Laboratory,
+University of Michigan, National Centers for Environmental Prediction, Los
+Alamos National Laboratory, Argonne National Laboratory, NASA Goddard Space
+Flight Center. All rights reserved.
+'''
+
+# standard
+import io
+import os
+import tempfile
+import unittest
+# local
+from esmftk import testresult, testsuite
+from esmftk.packageout import PackageOut
+
+ESMFMK = '''ESMF_VERSION_MAJOR=8
+ESMF_VERSION_MINOR=8
+ESMF_VERSION_REVISION=0
+ESMF_VERSION_PUBLIC='T'
+ESMF_VERSION_STRING=8.8.0
+ESMF_VERSION_STRING_GIT=v8.8.0
+ESMF_VERSION_BETASNAPSHOT='F'
+'''
+
+SUITE = '''name: selection
+esmf: {esmfmk}
+testsuite:
+    alpha: {{executable: alpha, mpinp: 4}}
+    beta: {{executable: beta, mpinp: 4}}
+    gamma: {{executable: gamma, mpi: False}}
+'''
+
+RESULTS = '''<?xml version="1.0" encoding="UTF-8"?>
+<testsuite tests="2" failures="1" hostname="prevhost"
+    timestamp="2025-01-01T00:00:00">
+  <testcase name="alpha" time="1.5" status="run">
+    <properties><property name="esmftk.fingerprint" value="aaaa"/>
+    </properties>
+  </testcase>
+  <testcase name="beta" time="2.5" status="fail">
+    <properties><property name="esmftk.fingerprint" value="bbbb"/>
+    </properties>
+  </testcase>
+</testsuite>
+'''
+
+class TestSelection(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        esmfmk = os.path.join(self.tmpdir.name, "esmf.mk")
+        with open(esmfmk, "w") as file:
+            file.write(ESMFMK)
+        suitefile = os.path.join(self.tmpdir.name, "suite.yml")
+        with open(suitefile, "w") as file:
+            file.write(SUITE.format(esmfmk=esmfmk))
+        self.resfile = os.path.join(self.tmpdir.name, "results.xml")
+        with open(self.resfile, "w") as file:
+            file.write(RESULTS)
+        self.output = io.StringIO()
+        self.suite = testsuite.TestSuite(suitefile,
+            PackageOut(stream=self.output))
+        self.history = testresult.TestResults.history(self.resfile)
+        self.fprints = {"alpha": "aaaa", "beta": "bbbb", "gamma": "cccc"}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_history(self):
+        self.assertEqual(sorted(self.history), ["alpha", "beta"])
+        tprops = testresult.TestResults.properties(self.history["alpha"])
+        self.assertEqual(tprops["esmftk.hostname"], "prevhost")
+        self.assertEqual(tprops["esmftk.timestamp"], "2025-01-01T00:00:00")
+        self.assertEqual(testresult.TestResults.history(None), {})
+
+    def test_select_all(self):
+        selected = self.suite.select_tests(self.history, self.fprints)
+        self.assertEqual(selected, ["alpha", "beta", "gamma"])
+
+    def test_rerun_failed(self):
+        selected = self.suite.select_tests(self.history, self.fprints,
+            rerun_failed=True)
+        self.assertEqual(selected, ["beta", "gamma"])
+
+    def test_rerun_failed_without_history(self):
+        selected = self.suite.select_tests({}, self.fprints,
+            rerun_failed=True)
+        self.assertEqual(selected, ["alpha", "beta", "gamma"])
+        self.assertIn("WARNING: no previous results", self.output.getvalue())
+
+    def test_changed(self):
+        # unchanged passing test skipped, failed and new tests selected
+        selected = self.suite.select_tests(self.history, self.fprints,
+            changed=True)
+        self.assertEqual(selected, ["beta", "gamma"])
+        self.fprints["alpha"] = "dddd"
+        selected = self.suite.select_tests(self.history, self.fprints,
+            changed=True)
+        self.assertEqual(selected, ["alpha", "beta", "gamma"])
+
+    def test_filter(self):
+        selected = self.suite.select_tests(self.history, self.fprints,
+            tfilter="^(alpha|gamma)$")
+        self.assertEqual(selected, ["alpha", "gamma"])
+        selected = self.suite.select_tests(self.history, self.fprints,
+            rerun_failed=True, tfilter="a$")
+        self.assertEqual(selected, ["beta", "gamma"])
+        selected = self.suite.select_tests(self.history, self.fprints,
+            tfilter="zzz")
+        self.assertEqual(selected, [])
+
+    def test_invalid_filter(self):
+        with self.assertRaises(SystemExit):
+            self.suite.check_filter("(")
+
+    def test_report_nothing_selected(self):
+        # all tests carried forward keep their original host and time
+        outfile = os.path.join(self.tmpdir.name, "results-latest.xml")
+        testresult.TestResults.merge([], outfile,
+            list(self.history.values()))
+        results = testresult.TestResults(outfile, self.suite.testsuite,
+            self.suite.esmf, PackageOut(stream=self.output))
+        self.assertIn("| alpha", results.markdown())
+        self.assertIn("beta,prevhost", results.csv())
+        for t in results.tests:
+            if t["name"] == "gamma":
+                self.assertEqual(t["status"], "notrun")
+            else:
+                self.assertEqual(t["hostname"], "prevhost")
+                self.assertEqual(t["timestamp"], "2025-01-01T00:00:00")
+        testresult.TestResults.merge([], outfile)
+        results = testresult.TestResults(outfile,
+            pkgout=PackageOut(stream=self.output))
+        self.assertEqual(results.tests, [])
+        results.markdown()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+'''
+ESMF TestKit (esmftk)
+
+Copyright (c) 2002-2025 University Corporation for Atmospheric Research,
+Massachusetts Institute of Technology, Geophysical Fluid Dynamics Laboratory,
+University of Michigan, National Centers for Environmental Prediction, Los
+Alamos National Laboratory, Argonne National Laboratory, NASA Goddard Space
+Flight Center. All rights reserved.
+'''
+
+# standard
+import io
+import os
+import tempfile
+import unittest
+# local
+from esmftk import testresult, testsuite
+from esmftk.packageout import PackageOut
+
+ESMFMK = '''ESMF_VERSION_MAJOR=8
+ESMF_VERSION_MINOR=8
+ESMF_VERSION_REVISION=0
+ESMF_VERSION_PUBLIC='T'
+ESMF_VERSION_STRING=8.8.0
+ESMF_VERSION_STRING_GIT=v8.8.0
+ESMF_VERSION_BETASNAPSHOT='F'
+'''
+
+SUITE = '''name: sharding
+esmf: {esmfmk}
+testsuite:
+    alpha: {{executable: alpha, mpinp: 8, timeout: 60}}
+    beta: {{executable: beta, mpinp: 4, timeout: 60}}
+    gamma: {{executable: gamma, mpinp: 4, timeout: 30}}
+    delta: {{executable: delta, mpinp: 2}}
+    epsilon: {{executable: epsilon, mpi: False, timeout: 10}}
+    zeta: {{executable: zeta, mpinp: 4, timeout: 30, repeat: 3}}
+'''
+
+SHARD = '''<?xml version="1.0" encoding="UTF-8"?>
+<testsuite hostname="host{index}" timestamp="2025-01-01T00:00:00">
+  <properties>
+    <property name="esmftk.suite" value="sharding"/>
+    <property name="esmftk.shard" value="{index}/2"/>
+    <property name="esmftk.tests" value="{tests}"/>
+    <property name="esmftk.partition" value="0123456789abcdef"/>
+  </properties>
+{testcases}
+</testsuite>
+'''
+
+class TestShard(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        esmfmk = os.path.join(self.tmpdir.name, "esmf.mk")
+        with open(esmfmk, "w") as file:
+            file.write(ESMFMK)
+        self.suitefile = os.path.join(self.tmpdir.name, "suite.yml")
+        with open(self.suitefile, "w") as file:
+            file.write(SUITE.format(esmfmk=esmfmk))
+        self.output = io.StringIO()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def shards(self, count: int, costs: str=None):
+        pkgout = PackageOut(stream=self.output)
+        return [testsuite.TestSuite(self.suitefile, pkgout,
+                    str(i) + "/" + str(count), costs)
+                for i in range(1, count + 1)]
+
+    def test_disjoint_cover(self):
+        alltests = list(testsuite.TestSuite(self.suitefile,
+            PackageOut(stream=self.output)).testsuite)
+        self.assertEqual(len(alltests), 8)
+        for count in [1, 3, 8, 10]:
+            shards = self.shards(count)
+            tnames = [t for s in shards for t in s.testsuite]
+            self.assertEqual(sorted(tnames), sorted(alltests))
+            self.assertEqual(len(set(tnames)), len(tnames))
+            self.assertEqual(len(set(s.partition for s in shards)), 1)
+
+    def test_stable(self):
+        first = self.shards(3)
+        second = self.shards(3)
+        for s1, s2 in zip(first, second):
+            self.assertEqual(list(s1.testsuite), list(s2.testsuite))
+            self.assertEqual(s1.partition, s2.partition)
+            self.assertTrue(s1.builddir.endswith("-shard" +
+                str(s1.shard[0]) + "of3"))
+        self.assertNotEqual(first[0].partition, self.shards(2)[0].partition)
+
+    def test_costs(self):
+        # a long running test gets a shard to itself
+        costs = os.path.join(self.tmpdir.name, "costs.xml")
+        with open(costs, "w") as file:
+            file.write('<testsuite><testcase name="epsilon" time="5000"/>' +
+                '</testsuite>')
+        default = self.shards(3)
+        weighted = self.shards(3, costs)
+        self.assertNotEqual(default[0].partition, weighted[0].partition)
+        self.assertNotIn(["epsilon"], [list(s.testsuite) for s in default])
+        self.assertIn(["epsilon"], [list(s.testsuite) for s in weighted])
+
+    def write_shard(self, index: int, tests: list, testcases: list):
+        resfile = os.path.join(self.tmpdir.name, "shard" + str(index) + ".xml")
+        with open(resfile, "w") as file:
+            file.write(SHARD.format(index=index, tests=",".join(tests),
+                testcases="\n".join(testcases)))
+        return resfile
+
+    def test_gather(self):
+        pkgout = PackageOut(stream=self.output)
+        passed = '  <testcase name="{}" time="1.0" status="run"/>'
+        resfiles = [self.write_shard(1, ["alpha"], [passed.format("alpha")]),
+            self.write_shard(2, ["beta"], [passed.format("beta")])]
+        results = testresult.TestResults.gather(resfiles, None, pkgout)
+        self.assertTrue(results.complete)
+        self.assertFalse(results.failed())
+        # a test listed in the shard without a testcase did not run
+        resfiles[1] = self.write_shard(2, ["beta", "gamma"],
+            [passed.format("beta")])
+        results = testresult.TestResults.gather(resfiles, None, pkgout)
+        self.assertFalse(results.complete)
+        self.assertTrue(results.failed())
+        self.assertEqual([t["name"] for t in results.tests],
+            ["alpha", "beta", "gamma"])
+        self.assertIn("results not found - gamma", self.output.getvalue())
+        # missing shards leave the gathered results incomplete
+        results = testresult.TestResults.gather(resfiles[:1], None, pkgout)
+        self.assertFalse(results.complete)
+        self.assertFalse(results.failed())
+
+if __name__ == "__main__":
+    unittest.main()